@@ -7,7 +7,11 @@ from . import libirc
 logger = getLogger(__name__)
 
 
-class IRCClientProtocol(asyncio.Protocol):
+class IRCClientProtocol(asyncio.BufferedProtocol):
+
+    #: Initial size of the buffer the transport reads into.
+    RECV_BUFFER_SIZE: int = 65536
+
     def __init__(
         self, loop: asyncio.AbstractEventLoop, config: dict, irc: libirc.IRCClient
     ):
@@ -17,15 +21,31 @@ class IRCClientProtocol(asyncio.Protocol):
 
         self._transport: Optional[asyncio.Transport] = None
 
+        # Preallocated buffer the transport reads into directly, avoiding
+        # the allocation of a new bytes object for each read.
+        self._recv_buffer = bytearray(self.RECV_BUFFER_SIZE)
+        self._recv_view = memoryview(self._recv_buffer)
+
+        # Data to send accumulated during the current iteration of the loop
+        self._send_buffer = bytearray()
+        self._send_scheduled = False
+
     # Protocol interface
 
     def connection_made(self, transport):
         self._transport = transport
+        self._transport_write = transport.write
         addr = (self._config["server"], self._config["port"])
         logger.info("Connected to %s:%d", *addr)
 
-    def data_received(self, data):
-        self._irc.add_received_data(data)
+    def get_buffer(self, sizehint):
+        if sizehint > len(self._recv_buffer):
+            self._recv_buffer = bytearray(sizehint)
+            self._recv_view = memoryview(self._recv_buffer)
+        return self._recv_view
+
+    def buffer_updated(self, nbytes):
+        self._irc.add_received_data(self._recv_view[:nbytes])
 
     def connection_lost(self, exc):
         logger.info("The server closed the connection")
@@ -34,5 +54,19 @@ class IRCClientProtocol(asyncio.Protocol):
     # IRC Client
 
     def send_bytes(self, data: bytes):
-        """Call this with the data to send to the remote server."""
-        self._transport.write(data)
+        """Call this with the data to send to the remote server.
+
+        Data sent during the same iteration of the event loop is coalesced
+        and handed to the transport with a single write.
+        """
+        self._send_buffer.extend(data)
+        if not self._send_scheduled:
+            self._send_scheduled = True
+            self._loop.call_soon(self._flush_send_buffer)
+
+    def _flush_send_buffer(self):
+        self._send_scheduled = False
+        # The transport may keep a reference to the written object, so
+        # hand it over instead of clearing it afterwards.
+        data, self._send_buffer = self._send_buffer, bytearray()
+        self._transport_write(data)
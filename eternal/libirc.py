@@ -2,32 +2,62 @@ import base64
 import enum
 import logging
 import re
+import sys
 from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from functools import lru_cache
+from types import MappingProxyType
+from typing import (
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def split_received(recv_buffer: bytearray) -> Iterator[memoryview]:
+    """Yield the complete messages of the receive buffer and consume them.
+
+    Messages are located in place by moving a start index through the
+    buffer and are yielded as views of it, without copying them. A view
+    is only valid until the next message is requested. The trailing
+    incomplete message, if any, is moved to the beginning of the buffer
+    once all complete messages are consumed.
+    """
+    start = 0
+    end = recv_buffer.find(b"\r\n")
+    view = memoryview(recv_buffer)
+    try:
+        while end != -1:
+            with view[start:end] as message:
+                start = end + 2
+                end = recv_buffer.find(b"\r\n", start)
+                yield message
+    finally:
+        # The buffer cannot be resized while a view on it exists
+        view.release()
+        if start:
+            del recv_buffer[:start]
+
+
 def parse_received(recv_buffer: bytearray):
-    messages = recv_buffer.split(b"\r\n")
-    index = recv_buffer.rfind(b"\r\n")
-    if index != -1:
-        messages.pop()
-        with open("/tmp/received.log", mode="ab") as f:
-            f.write(recv_buffer[: index + 2])
-        recv_buffer[: index + 2] = b""
-    else:
-        with open("/tmp/received.log", mode="ab") as f:
-            f.write(recv_buffer)
-
-    for message in messages:
+    """Parse and consume the complete messages of the receive buffer."""
+    for message in split_received(recv_buffer):
         yield parse_message(message)
 
 
 def get_utc_now() -> datetime:
-    return datetime.utcnow().replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc)
 
 
 class Numeric(enum.Enum):
@@ -95,7 +125,7 @@ class Channel:
 class Message:
     """Represent an IRC message."""
 
-    tags: dict = field(default_factory=dict)
+    tags: Mapping[str, str] = field(default_factory=dict)
     source: Source = field(default_factory=Source)
     command: str = ""
     params: List[str] = field(default_factory=list)
@@ -104,15 +134,12 @@ class Message:
 
     def to_bytes(self) -> bytes:
         # TODO: This is very incomplete
-        rv = self.command
-        params = self.params.copy()
-        try:
-            params[-1] = ":" + params[-1]
-        except IndexError:
-            pass
-        else:
-            rv += f" {' '.join(params)}"
-        return rv.encode()
+        if not self.params:
+            return self.command.encode()
+
+        # The line is joined and encoded once, without copying the params
+        *middle, last = self.params
+        return " ".join([self.command, *middle, ":" + last]).encode()
 
 
 @dataclass
@@ -255,8 +282,8 @@ class ConnectionClosedEvent:
 
 class UserDefaultDict(defaultdict):
     def __missing__(self, key: str):
-        self[key] = User(source=Source(nick=key))
-        return self[key]
+        user = self[key] = User(source=Source(nick=key))
+        return user
 
 
 class TypingStatus(enum.Enum):
@@ -266,10 +293,32 @@ class TypingStatus(enum.Enum):
     DONE = "done"
 
 
+#: Minimum delay between two active typing notifications sent for a channel
+TYPING_ACTIVE_UPDATE_INTERVAL = timedelta(seconds=3)
+
+
+# Capabilities requested when the server supports them, in this order
+CLIENT_SUPPORTED_CAPABILITIES = (
+    "message-tags",
+    "echo-message",
+    "server-time",
+    "batch",
+    "away-notify",
+    "multi-prefix",
+)
+
+# Lines sent verbatim during the handshake, encoded once
+CAP_LS_LINE = b"CAP LS 302\r\n"
+CAP_REQ_SASL_LINE = b"CAP REQ :sasl\r\n"
+CAP_END_LINE = b"CAP END\r\n"
+AUTHENTICATE_PLAIN_LINE = b"AUTHENTICATE PLAIN\r\n"
+
+
 class IRCClient:
     def __init__(self, config: dict, inbox):
         self._config = config
         self._server_connection = None
+        self._raw_log: Optional[BinaryIO] = None
         self.inbox = inbox
 
         self.capabilities: Dict[str, Union[bool, str]] = {}
@@ -287,195 +336,283 @@ class IRCClient:
         self._tmp_motd: List[str] = list()
         self._handshake_steps: List[Tuple[Callable, Callable]] = list()
 
+        # Methods processing each kind of message, indexed by command.
+        # Messages with a command not in this dict are passed as-is.
+        self._message_processors: Dict[str, Callable[[Message], List[Message]]] = {
+            "PRIVMSG": self._process_privmsg_message,
+            "NOTICE": self._process_privmsg_message,
+            "PING": self._process_ping_message,
+            "JOIN": self._process_join_message,
+            "PART": self._process_part_message,
+            "QUIT": self._process_quit_message,
+            "AWAY": self._process_away_message,
+            "KICK": self._process_kick_message,
+            "NICK": self._process_nick_message,
+            "MODE": self._process_mode_message,
+            "TAGMSG": self._process_tagmsg_message,
+            "CAP": self._process_cap_message,
+            "001": self._process_001_message,
+            "002": self._process_001_message,
+            "003": self._process_001_message,
+            "004": self._process_001_message,
+            "005": self._process_005_message,
+            "221": self._process_221_message,
+            "305": self._process_305_message,
+            "306": self._process_306_message,
+            "315": self._process_315_message,
+            "324": self._process_324_message,
+            "332": self._process_332_message,
+            "333": self._process_333_message,
+            "352": self._process_352_message,
+            "353": self._process_353_message,
+            "366": self._process_366_message,
+            "372": self._process_372_message,
+            "375": self._process_375_message,
+            "376": self._process_376_message,
+        }
+
     def notify_connection_established(self, server_connection):
         """Call this when the connection to the remote server has been established."""
         self._server_connection = server_connection
+
+        # Optional raw log of everything exchanged with the server, kept open
+        # for the whole connection rather than opened for each write.
+        raw_log_path = self._config.get("raw_log")
+        if raw_log_path:
+            self._raw_log = open(raw_log_path, mode="ab", buffering=64 * 1024)
+
         self._hanshake_start()
 
     def notify_connection_closed(self):
         """Call this when the remote server closed the connection."""
+        if self._raw_log is not None:
+            self._raw_log.close()
+            self._raw_log = None
         self.inbox.put_nowait(ConnectionClosedEvent())
 
-    def send_to_server(self, line: str):
-        payload = line.encode() + b"\r\n"
-        with open("/tmp/received.log", mode="ab") as f:
-            f.write(payload)
+    def _write_raw_log(self, data: bytes):
+        if self._raw_log is not None:
+            self._raw_log.write(data)
+
+    def _send_payload(self, payload: bytes):
+        self._write_raw_log(payload)
         self._server_connection.send_bytes(payload)
 
+    def send_to_server(self, line: str):
+        self._send_payload(line.encode() + b"\r\n")
+
     def send_message_to_server(self, msg: ClientMessage):
-        payload = msg.to_bytes() + b"\r\n"
-        with open("/tmp/received.log", mode="ab") as f:
-            f.write(payload)
-        self._server_connection.send_bytes(payload)
+        self._send_payload(msg.to_bytes() + b"\r\n")
 
     def add_received_data(self, data: bytes):
         """Call this with the data received from the remote server."""
+        self._write_raw_log(data)
         self._recv_buffer.extend(data)
 
+        # Events are all delivered to the single consumer of the inbox,
+        # look its method up once for the whole received data.
+        put_event = self.inbox.put_nowait
+
         # The receive buffer may contain multiple messages to parse
-        for msg in parse_received(self._recv_buffer):
+        for line in split_received(self._recv_buffer):
+
+            # Keepalives are answered without parsing them
+            if line[:5] == b"PING ":
+                self._send_payload(b"PONG " + line[5:] + b"\r\n")
+                continue
+
+            msg = parse_message(line)
 
             # Each parsed message, once processed may result in multiple
             # events being generated.
             for processed_msg in self._process_message(msg):
-                self.inbox.put_nowait(processed_msg)
+                put_event(processed_msg)
+
+            # Steps are only pending while connecting to the server
+            if self._handshake_steps:
+                self._run_handshake_steps(msg)
+
+    def _run_handshake_steps(self, msg: Message):
+        """Run the handshake steps waiting for the message just received.
 
-                if self._handshake_steps:
-                    for handshake_step in self._handshake_steps.copy():
-                        step_fence, step = handshake_step
-                        if step_fence(msg):
-                            self._handshake_steps.remove(handshake_step)
-                            step()
+        Steps added while running are only checked from the next message on.
+        """
+        for handshake_step in self._handshake_steps.copy():
+            step_fence, step = handshake_step
+            if step_fence(msg):
+                self._handshake_steps.remove(handshake_step)
+                step()
 
     def _process_message(self, msg: Message) -> List[Message]:
-        # Batches allow to put messages on hold and deliver them all at
-        # once, a bit like a database transaction.
-        # Note that this implementation probably doesn't handle nested
-        # batches well.
+        # BATCH messages are processed before looking at the batch tag so
+        # that a batch nested in another one starts and ends right away.
         if msg.command == "BATCH":
-            rv = list()
-            if msg.params[0].startswith("+"):
-                # Beginning of a new batch
-                self._tmp_batches[msg.params[0][1:]] = list()
-            elif msg.params[0].startswith("-"):
-                # End of a batch
-                for batch_msg in self._tmp_batches.pop(msg.params[0][1:], []):
-                    rv.extend(self._process_message(batch_msg))
-            return rv
+            return self._process_batch_message(msg)
 
         # Add the current message to an in progress batch if the
-        # message carries a batch tag and the batch exists.
+        # message carries a batch tag and the batch exists. Most messages
+        # are not part of a batch, so this avoids raising a KeyError.
+        batch = self._tmp_batches.get(msg.tags.get("batch"))
+        if batch is not None:
+            batch.append(msg)
+            return []
+
         try:
-            self._tmp_batches[msg.tags["batch"]].append(msg)
+            method = self._message_processors[msg.command]
         except KeyError:
-            pass
-        else:
+            return [msg]
+
+        return method(msg)
+
+    def _process_batch_message(self, msg: Message):
+        """Batches allow to put messages on hold and deliver them all at
+        once, a bit like a database transaction.
+
+        Note that this implementation probably doesn't handle nested
+        batches well.
+        """
+        reference_tag = msg.params[0]
+        if reference_tag.startswith("+"):
+            # Beginning of a new batch
+            self._tmp_batches[reference_tag[1:]] = []
             return []
 
+        if reference_tag.startswith("-"):
+            # End of a batch, its messages are processed in order. Their
+            # batch does not exist anymore so they do not get put on hold
+            # again.
+            rv = []
+            for batch_msg in self._tmp_batches.pop(reference_tag[1:], []):
+                rv.extend(self._process_message(batch_msg))
+            return rv
+
+        return []
+
+    def _process_privmsg_message(self, msg: Message):
+        """PRIVMSG and NOTICE, messages sent to a channel or to the current user."""
+        destination, text = msg.params[:2]
+        if destination == self.nick:
+            destination = msg.source.nick or msg.source.host
+
+        self.users[msg.source.nick].last_message_at = get_utc_now()
+        ctcp_action = parse_ctcp_action(message=text)
+        if ctcp_action is not None:
+            rv = [
+                NewActionMessageEvent(
+                    channel=destination, message=ctcp_action, **msg.__dict__
+                )
+            ]
+        else:
+            rv = [NewMessageEvent(channel=destination, message=text, **msg.__dict__)]
+
+        # A client sending a message should reset its typing status
         try:
-            method = getattr(self, f"_process_{msg.command.lower()}_message")
-        except AttributeError:
+            channel = self.channels[destination]
+            member = channel.members[msg.source.nick]
+        except KeyError:
             pass
         else:
-            return method(msg)
-
-        if msg.command in ("PRIVMSG", "NOTICE"):
-            destination = msg.params[0]
-            if destination == self._config["nick"]:
-                destination = msg.source.nick or msg.source.host
-
-            self.users[msg.source.nick].last_message_at = get_utc_now()
-            ctcp_action = parse_ctcp_action(message=msg.params[1])
-            if ctcp_action is not None:
-                rv = [
-                    NewActionMessageEvent(
-                        channel=destination, message=ctcp_action, **msg.__dict__
-                    )
-                ]
-            else:
-                rv = [
-                    NewMessageEvent(
-                        channel=destination, message=msg.params[1], **msg.__dict__
-                    )
-                ]
-
-            # A client sending a message should reset its typing status
-            try:
-                channel = self.channels[destination]
-                member = channel.members[msg.source.nick]
-            except KeyError:
-                pass
-            else:
-                if member.is_typing:
-                    member.is_typing = False
-                    member.last_typing_update_at = None
-                    rv.append(ChannelTypingEvent(channel=destination, **msg.__dict__))
+            if member.is_typing:
+                member.is_typing = False
+                member.last_typing_update_at = None
+                rv.append(ChannelTypingEvent(channel=destination, **msg.__dict__))
 
-            return rv
+        return rv
 
-        if msg.command in ("001", "002", "003", "004"):
-            message = " ".join(msg.params[1:])
-            return [NewMessageFromServerEvent(message=message, **msg.__dict__)]
+    def _process_001_message(self, msg: Message):
+        """RPL_WELCOME up to RPL_MYINFO, information about the server."""
+        message = " ".join(msg.params[1:])
+        return [NewMessageFromServerEvent(message=message, **msg.__dict__)]
 
-        if msg.command == "005":
-            supported, not_supported = parse_supported(msg.params)
-            self.supported.update(supported)
-            for ns in not_supported:
-                self.supported.pop(ns, None)
+    def _process_005_message(self, msg: Message):
+        """RPL_ISUPPORT advertises the features supported by the server."""
+        supported, not_supported = parse_supported(msg.params)
+        self.supported.update(supported)
+        for ns in not_supported:
+            self.supported.pop(ns, None)
 
-            try:
-                prefix = self.supported["PREFIX"]
-            except KeyError:
-                pass
-            else:
-                self.member_prefixes = parse_member_prefixes(prefix)
+        # Only the features advertised by this message need to be parsed,
+        # the server sends them over several messages
+        try:
+            prefix = supported["PREFIX"]
+        except KeyError:
+            pass
+        else:
+            self.member_prefixes = parse_member_prefixes(prefix)
 
-            try:
-                network = self.supported["NETWORK"]
-            except KeyError:
-                pass
-            else:
-                if network:
-                    self.name = network
+        try:
+            network = supported["NETWORK"]
+        except KeyError:
+            pass
+        else:
+            if network:
+                self.name = network
 
-            try:
-                chanmodes = self.supported["CHANMODES"]
-            except KeyError:
-                pass
-            else:
-                self.channel_modes = parse_chanmodes(chanmodes)
+        try:
+            chanmodes = supported["CHANMODES"]
+        except KeyError:
+            pass
+        else:
+            self.channel_modes = parse_chanmodes(chanmodes)
 
-            return []
+        return []
 
-        if msg.command == "375":
-            self._tmp_motd = list()
-            return []
+    def _process_375_message(self, msg: Message):
+        """RPL_MOTDSTART"""
+        self._tmp_motd = list()
+        return []
 
-        if msg.command == "372":
-            self._tmp_motd.append(
-                NewMessageFromServerEvent(message=msg.params[1], **msg.__dict__)
-            )
-            return []
+    def _process_372_message(self, msg: Message):
+        """RPL_MOTD"""
+        self._tmp_motd.append(
+            NewMessageFromServerEvent(message=msg.params[1], **msg.__dict__)
+        )
+        return []
 
-        if msg.command == "376":
-            motd = self._tmp_motd
-            self._tmp_motd = list()
-            return motd
+    def _process_376_message(self, msg: Message):
+        """RPL_ENDOFMOTD"""
+        motd = self._tmp_motd
+        self._tmp_motd = list()
+        return motd
+
+    def _process_353_message(self, msg: Message):
+        """RPL_NAMREPLY"""
+        # Nicks are only split once all replies are received
+        channel, nicks = msg.params[2:4]
+        self._tmp_channel_nicks[channel].append(nicks)
+        return []
 
-        if msg.command == "353":
-            channel = msg.params[2]
-            nicks = msg.params[3].split(" ")
-            self._tmp_channel_nicks[channel].extend(nicks)
-            return []
+    def _process_366_message(self, msg: Message):
+        """RPL_ENDOFNAMES"""
+        channel = msg.params[1]
+        nicks = " ".join(self._tmp_channel_nicks.pop(channel, [])).split()
 
-        if msg.command == "366":
-            channel = msg.params[1]
-            nicks = self._tmp_channel_nicks.pop(channel)
+        # Prefix symbols are gathered once for all the nicks of the channel
+        prefix_symbols = "".join(self.member_prefixes.values())
 
-            def _member_from_nick(nick: str) -> Member:
+        def _member_from_nick(nick: str) -> Member:
+            # Prefixes are the leading symbols, a nick made only of them is
+            # kept whole as there would be nothing left
+            i = len(nick) - len(nick.lstrip(prefix_symbols))
+            if i == len(nick):
                 i = 0
-                for i, symbol in enumerate(nick):
-                    if symbol not in self.member_prefixes.values():
-                        break
 
-                prefixes = nick[:i]
-                highest_prefix = get_highest_member_prefix(
-                    self.member_prefixes, prefixes
-                )
-                nick = nick[i:]
-                user = self.users[nick]
+            prefixes = nick[:i]
+            highest_prefix = get_highest_member_prefix(self.member_prefixes, prefixes)
+            nick = nick[i:]
+            user = self.users[nick]
 
-                return Member(user, prefixes=prefixes, highest_prefix=highest_prefix)
+            return Member(user, prefixes=prefixes, highest_prefix=highest_prefix)
 
-            members = [_member_from_nick(nick) for nick in nicks]
-            self.channels[channel].members = {m.user.source.nick: m for m in members}
+        members = [_member_from_nick(nick) for nick in nicks]
+        self.channels[channel].members = {m.user.source.nick: m for m in members}
 
-            return [ChannelNamesEvent(channel=channel, nicks=nicks, **msg.__dict__)]
+        return [ChannelNamesEvent(channel=channel, nicks=nicks, **msg.__dict__)]
 
-        if msg.command == "CAP":
-            if msg.params[1] == "LS":
-                self.capabilities.update(parse_capabilities_ls(msg.params))
-            # TODO: Handle add and remove capability
+    def _process_cap_message(self, msg: Message):
+        if msg.params[1] == "LS":
+            self.capabilities.update(parse_capabilities_ls(msg.params))
+        # TODO: Handle add and remove capability
 
         return [msg]
 
@@ -526,10 +663,13 @@ class IRCClient:
         return rv
 
     def _process_quit_message(self, msg: Message):
-        # Generate an individual quit event for each channel a user was in
+        # Generate an individual quit event for each channel a user was in,
+        # the attributes common to all of them are looked up once
+        nick = msg.source.nick
+        msg_attrs = msg.__dict__
         rv = list()
         for channel in self.channels.values():
-            member = channel.members.pop(msg.source.nick, None)
+            member = channel.members.pop(nick, None)
             if member is not None:
 
                 # Reset the away status of the user
@@ -539,14 +679,14 @@ class IRCClient:
                 if member.is_typing:
                     member.is_typing = False
                     member.last_typing_update_at = None
-                    rv.append(ChannelTypingEvent(channel=channel.name, **msg.__dict__))
+                    rv.append(ChannelTypingEvent(channel=channel.name, **msg_attrs))
 
                 rv.append(
                     QuitEvent(
                         channel=channel.name,
                         user=member.user,
                         reason=msg.params[0],
-                        **msg.__dict__,
+                        **msg_attrs,
                     )
                 )
 
@@ -595,6 +735,7 @@ class IRCClient:
             return rv
 
         self.users[nick].is_away = is_away
+        msg_attrs = msg.__dict__
         for channel in self.channels.values():
             member = channel.members.get(nick)
             if member is not None:
@@ -604,22 +745,20 @@ class IRCClient:
                             channel=channel.name,
                             user=member.user,
                             away_message=away_message,
-                            **msg.__dict__,
+                            **msg_attrs,
                         )
                     )
                 else:
                     rv.append(
                         BackFromAwayEvent(
-                            channel=channel.name, user=member.user, **msg.__dict__
+                            channel=channel.name, user=member.user, **msg_attrs
                         )
                     )
 
         return rv
 
     def _process_kick_message(self, msg: Message):
-        channel_name = msg.params[0]
-        kicked_nick = msg.params[1]
-        reason = msg.params[2]
+        channel_name, kicked_nick, reason = msg.params[:3]
         if kicked_nick == self.nick and channel_name in self.channels:
             del self.channels[channel_name]
         else:
@@ -645,11 +784,14 @@ class IRCClient:
 
         user = self.users[old_nick]
         del self.users[old_nick]
-        user.source.source.replace(old_nick + "!", new_nick + "!")
+        user.source.source = user.source.source.replace(
+            old_nick + "!", new_nick + "!", 1
+        )
         user.source.nick = new_nick
         self.users[new_nick] = user
 
         # Generate an individual event for each channel a user is in
+        msg_attrs = msg.__dict__
         rv = list()
         for channel in self.channels.values():
             if old_nick in channel.members:
@@ -661,7 +803,7 @@ class IRCClient:
                         user=user,
                         old_nick=old_nick,
                         new_nick=new_nick,
-                        **msg.__dict__,
+                        **msg_attrs,
                     )
                 )
 
@@ -685,12 +827,14 @@ class IRCClient:
                             member.highest_prefix = get_highest_member_prefix(
                                 self.member_prefixes, member.prefixes
                             )
-                    else:
-                        # Remove prefix from the channel member
+                    elif prefix in member.prefixes:
+                        # Remove prefix from the channel member, the highest
+                        # prefix only changes if it is the one removed
                         member.prefixes = member.prefixes.replace(prefix, "")
-                        member.highest_prefix = get_highest_member_prefix(
-                            self.member_prefixes, member.prefixes
-                        )
+                        if prefix == member.highest_prefix:
+                            member.highest_prefix = get_highest_member_prefix(
+                                self.member_prefixes, member.prefixes
+                            )
                     rv.append(
                         ChannelNamesEvent(
                             channel=channel.name, nicks=[], **msg.__dict__
@@ -698,11 +842,11 @@ class IRCClient:
                     )
                 else:
                     # The mode change is about a channel
-                    if is_add and mode not in channel.modes:
+                    if is_add:
                         # Add mode to the channel if it doesn't already have it
                         if mode not in channel.modes:
                             channel.modes += mode
-                    else:
+                    elif mode in channel.modes:
                         # Remove mode from the channel
                         channel.modes = channel.modes.replace(mode, "")
                     rv.append(
@@ -715,9 +859,10 @@ class IRCClient:
             user = self.users[target]
             for is_add, mode, _ in self._iter_modestring(modestring, args, False):
                 if is_add:
-                    user.modes += mode
-                else:
-                    user.modes.replace(mode, "")
+                    if mode not in user.modes:
+                        user.modes += mode
+                elif mode in user.modes:
+                    user.modes = user.modes.replace(mode, "")
 
         else:
             logger.warning("Received a MODE message for a target that does not exist")
@@ -751,7 +896,7 @@ class IRCClient:
         return [ChannelModeEvent(channel=channel_name, modes=modes, **msg.__dict__)]
 
     def _process_332_message(self, msg: Message):
-        channel_name, topic = msg.params[1], msg.params[2]
+        channel_name, topic = msg.params[1:3]
         try:
             self.channels[channel_name].topic = topic
         except KeyError:
@@ -760,7 +905,7 @@ class IRCClient:
         return [ChannelTopicEvent(channel=channel_name, topic=topic, **msg.__dict__)]
 
     def _process_333_message(self, msg: Message):
-        channel_name, who, date = msg.params[1], msg.params[2], msg.params[3]
+        channel_name, who, date = msg.params[1:4]
         return [
             ChannelTopicWhoTimeEvent(
                 channel=channel_name,
@@ -772,9 +917,8 @@ class IRCClient:
 
     def _process_352_message(self, msg: Message):
         """RPL_WHOREPLY response after a WHO, containing information about a user."""
-        channel_name = msg.params[1]
-        nick = msg.params[5]
-        is_away = "G" in msg.params[6]
+        _, channel_name, _, _, _, nick, flags, *_ = msg.params
+        is_away = "G" in flags
 
         # When the server has "ISUPPORT BOT=b", users who have "mode +b"
         # will have an extra "b" in the field that supposed to tell if they
@@ -785,7 +929,7 @@ class IRCClient:
         except KeyError:
             is_bot = False
         else:
-            is_bot = bot_character in msg.params[6]
+            is_bot = bot_character in flags
 
         # Only process the reply to WHO when it is about a known channel and
         # away status is tracked.
@@ -881,10 +1025,8 @@ class IRCClient:
             )
             return True
 
-        if member.last_typing_update_at + timedelta(seconds=3) < get_utc_now():
-            return True
-
-        return False
+        next_update_at = member.last_typing_update_at + TYPING_ACTIVE_UPDATE_INTERVAL
+        return next_update_at < get_utc_now()
 
     def notify_typing_active(self, channel_name: str):
         """Send a notification that the user is typing if necessary."""
@@ -942,12 +1084,15 @@ class IRCClient:
 
         Equivalent to ORDER BY prefix, nick.
         """
-        member_prefixes_symbols = list(self.member_prefixes.values())
+        prefix_order = {
+            symbol: i for i, symbol in enumerate(self.member_prefixes.values())
+        }
+        no_prefix = len(prefix_order)
         return sorted(
             members,
             key=lambda m: (
-                [str(member_prefixes_symbols.index(c)) for c in m.prefixes]
-                or ["z"] + list(m.user.source.nick.lower())
+                min((prefix_order[c] for c in m.prefixes), default=no_prefix),
+                m.user.source.nick.lower(),
             ),
         )
 
@@ -964,10 +1109,11 @@ class IRCClient:
             elif m in self.member_prefixes:
                 yield is_add, m, args[args_i]
                 args_i += 1
-            elif self.channel_modes[m] in ("A", "B"):
+            # Modes not advertised by the server are assumed to take no argument
+            elif self.channel_modes.get(m) in ("A", "B"):
                 yield is_add, m, args[args_i]
                 args_i += 1
-            elif self.channel_modes[m] == "C" and is_add:
+            elif self.channel_modes.get(m) == "C" and is_add:
                 yield is_add, m, args[args_i]
                 args_i += 1
             else:
@@ -991,7 +1137,7 @@ class IRCClient:
         self._handshake_steps.append(
             (is_capabilities_received, self._handshake_authenticate_step_1)
         )
-        self.send_to_server("CAP LS 302")
+        self._send_payload(CAP_LS_LINE)
         self.send_to_server(f'NICK {self._config["nick"]}')
         self.send_to_server(
             f'USER {self._config["user"]} 0 * :{self._config["real_name"]}'
@@ -1014,8 +1160,8 @@ class IRCClient:
         self._handshake_steps.append(
             (is_authenticate_plus_received, self._handshake_authenticate_step_2)
         )
-        self.send_to_server("CAP REQ :sasl")
-        self.send_to_server("AUTHENTICATE PLAIN")
+        self._send_payload(CAP_REQ_SASL_LINE)
+        self._send_payload(AUTHENTICATE_PLAIN_LINE)
 
     def _handshake_authenticate_step_2(self):
         def is_903_received(msg: Message):
@@ -1036,47 +1182,42 @@ class IRCClient:
 
         self._handshake_steps.append((is_001_received, self._handshake_join_channels))
 
-        client_supported_capabilities = (
-            "message-tags",
-            "echo-message",
-            "server-time",
-            "batch",
-            "away-notify",
-            "multi-prefix",
+        # All the capabilities are requested at once, they were all
+        # advertised by the server so none of them gets the request refused
+        requested_capabilities = " ".join(
+            capability
+            for capability in CLIENT_SUPPORTED_CAPABILITIES
+            if capability in self.capabilities
         )
-        for capability in client_supported_capabilities:
-            if capability in self.capabilities:
-                self.send_to_server(f"CAP REQ :{capability}")
+        if requested_capabilities:
+            self.send_to_server(f"CAP REQ :{requested_capabilities}")
 
-        self.send_to_server("CAP END")
+        self._send_payload(CAP_END_LINE)
 
     def _handshake_join_channels(self):
         for channel in self._config.get("channels", []):
             self.send_to_server(f"JOIN {channel}")
 
 
-def parse_message(data: bytearray) -> Message:
-    message_str = data.decode(errors="replace")
-    if message_str.startswith("@"):
-        tags = parse_message_tags(message_str[1 : message_str.find(" ")])
-        message_str = message_str[message_str.find(" ") + 1 :]
-    else:
-        tags = {}
-
-    if message_str.startswith(":"):
-        source = message_str[1 : message_str.find(" ")]
-        message_str = message_str[message_str.find(" ") + 1 :]
-    else:
-        source = ""
-    source = parse_message_source(source)
-
-    space_index = message_str.find(" ")
-    if space_index == -1:
-        command = message_str.upper()
-        params = []
-    else:
-        command = message_str[:space_index].upper()
-        params = parse_message_params(message_str[space_index + 1 :])
+# Tags of all the messages without tags, shared as most messages have none
+NO_TAGS: Mapping[str, str] = MappingProxyType({})
+
+# Split a message into its optional tags and source, its command and
+# the rest of its parameters, all in one pass of the regex engine.
+MESSAGE_REGEX = re.compile(r"(?:@([^ ]*) )?(?::([^ ]*) )?([^ ]*)(?: (.*))?", re.DOTALL)
+
+
+def parse_message(data: Union[bytes, bytearray, memoryview]) -> Message:
+    message_str = str(data, encoding="utf-8", errors="replace")
+    tags, source, command, params = MESSAGE_REGEX.match(message_str).groups()
+
+    tags = parse_message_tags(tags) if tags is not None else NO_TAGS
+    source = parse_message_source(source or "")
+
+    # Commands are interned as they come from a small set of values that
+    # are then compared to literals and used as keys of dicts
+    command = sys.intern(command.upper())
+    params = parse_message_params(params) if params is not None else []
 
     try:
         # The time of a message may be included in tags if the
@@ -1090,28 +1231,55 @@ def parse_message(data: bytearray) -> Message:
 
 def parse_rfc3339_datetime(datetime_str: str) -> datetime:
     """Parse a subset of RFC 3339, also known as ISO 8601:2004(E)."""
+    # Servers send times in UTC with a "Z" suffix, which fromisoformat only
+    # understands since Python 3.11. It is much faster than strptime.
+    if datetime_str.endswith("Z"):
+        try:
+            return datetime.fromisoformat(datetime_str[:-1] + "+00:00")
+        except ValueError:
+            pass
+
     return datetime.strptime(datetime_str, "%Y-%m-%dT%H:%M:%S.%f%z")
 
 
 # Tag values can contain escaped characters:
 # https://ircv3.net/specs/extensions/message-tags#escaping-values
-# Unlike the spec, this approach does not work with extraneous lone '\'.
-TAG_VALUE_ESCAPE = {r"\:": ";", r"\s": " ", r"\\": "\\", r"\r": "\r", r"\n": "\n"}
+# Maps the character following a backslash to the character it represents.
+TAG_VALUE_ESCAPE = {":": ";", "s": " ", "\\": "\\", "r": "\r", "n": "\n"}
+
+
+def unescape_tag_value(value: str) -> str:
+    """Unescape the value of a tag in a single pass.
+
+    As per the spec, a backslash that does not start a known escape sequence
+    is dropped and the character following it is kept as is.
+    """
+    rv = []
+    start = 0
+    index = value.find("\\")
+    while index != -1:
+        rv.append(value[start:index])
+        escaped = value[index + 1 : index + 2]
+        rv.append(TAG_VALUE_ESCAPE.get(escaped, escaped))
+        start = index + 2
+        index = value.find("\\", start)
+
+    rv.append(value[start:])
+    return "".join(rv)
 
 
 def parse_message_tags(tags: str) -> Dict[str, str]:
-    rv = dict()
+    rv = {}
     for tag in tags.split(";"):
         if "=" in tag:
             key, value = tag.split("=", maxsplit=1)
-            if value.endswith("\\"):
-                value = value[:-1]
-            for escaped, actual in TAG_VALUE_ESCAPE.items():
-                value = value.replace(escaped, actual)
+            # Most values contain no escape and can be kept as they are
+            if "\\" in value:
+                value = unescape_tag_value(value)
         else:
             key = tag
             value = ""
-        rv[key] = value
+        rv[sys.intern(key)] = value
     return rv
 
 
@@ -1122,66 +1290,52 @@ def parse_message_params(params: str) -> List[str]:
     if params.startswith(":"):
         return [params[1:]]
 
-    index = params.find(" :")
-    if index == -1:
+    middle, sep, trailing = params.partition(" :")
+    if not sep:
         return params.split(" ")
 
-    rv = params[:index].split(" ")
-    rv.append(params[index + 2 :])
+    rv = middle.split(" ")
+    rv.append(trailing)
     return rv
 
 
+# The same few sources keep sending messages, their parsed value is shared
+# between messages which must therefore not modify it
+@lru_cache(maxsize=1024)
 def parse_message_source(source: str) -> Source:
     if source == "":
         return Source("", "", "", "")
 
-    i_ex = source.find("!")
-    i_at = source.find("@")
-    if i_ex == -1 or i_at == -1:
-        return Source(
-            source,
-            "",
-            "",
-            source[i_at + 1 :],
-        )
+    nick, ex, user_host = source.partition("!")
+    user, at, host = user_host.partition("@")
+    if ex and at:
+        return Source(source, nick, user, host)
 
-    return Source(
-        source,
-        source[:i_ex],
-        source[i_ex + 1 : i_at],
-        source[i_at + 1 :],
-    )
+    # Servers only have a host
+    _, at, host = source.partition("@")
+    return Source(source, "", "", host if at else source)
 
 
 def parse_capabilities_ls(cap_params: List[str]) -> Dict[str, Union[bool, str]]:
-    rv = dict()
-    cap_str = cap_params[-1]
-    capabilities = cap_str.split(" ")
-    for capability in capabilities:
-        if "=" in capability:
-            key, value = capability.split("=", maxsplit=1)
-        else:
-            key = capability
-            value = True
-        rv[key] = value
+    rv = {}
+    for capability in cap_params[-1].split(" "):
+        key, eq, value = capability.partition("=")
+        rv[key] = value if eq else True
 
     return rv
 
 
 def get_sasl_plain_payload(user: str, password: str) -> str:
-    return base64.b64encode(f"{user}\00{user}\00{password}".encode()).decode()
+    user_bytes = user.encode()
+    payload = b"\0".join((user_bytes, user_bytes, password.encode()))
+    return base64.b64encode(payload).decode("ascii")
 
 
 def parse_supported(params: List[str]) -> Tuple[Dict[str, str], Set[str]]:
-    supported = dict()
+    supported = {}
     not_supported = set()
     for param in params[1:-1]:
-        if "=" in param:
-            key, value = param.split("=", maxsplit=1)
-        else:
-            key = param
-            value = ""
-
+        key, _, value = param.partition("=")
         if key.startswith("-"):
             not_supported.add(key[1:])
         else:
@@ -1191,15 +1345,11 @@ def parse_supported(params: List[str]) -> Tuple[Dict[str, str], Set[str]]:
 
 
 def parse_member_prefixes(prefixes: str) -> Dict[str, str]:
-    rv = dict()
-    if prefixes == "":
-        return rv
+    letters, sep, symbols = prefixes.partition(")")
+    if not sep:
+        return {}
 
-    letters, symbols = prefixes.split(")")
-    letters = letters[1:]
-    for key, value in zip(letters, symbols):
-        rv[key] = value
-    return rv
+    return dict(zip(letters[1:], symbols))
 
 
 def get_highest_member_prefix(
@@ -1218,14 +1368,9 @@ def get_highest_member_prefix(
 
 
 def parse_chanmodes(chanmodes: str) -> Dict[str, str]:
-    rv = dict()
-    mode_types = "ABCDEFGHIJKLM"
-    mode_type_i = 0
-    for mode in chanmodes:
-        if mode == ",":
-            mode_type_i += 1
-        else:
-            rv[mode] = mode_types[mode_type_i]
+    rv = {}
+    for mode_type, modes in zip("ABCDEFGHIJKLM", chanmodes.split(",")):
+        rv.update(dict.fromkeys(modes, mode_type))
     return rv
 
 
@@ -1,3 +1,4 @@
+import asyncio
 import hashlib
 import re
 from datetime import datetime
@@ -482,138 +483,145 @@ class UI(urwid.Frame):
         while True:
             msg = await irc.inbox.get()
 
-            if isinstance(msg, libirc.ConnectionClosedEvent):
-                raise urwid.ExitMainLoop()
+            # Messages often arrive in bursts, handle all the ones already
+            # queued before drawing the screen only once.
+            while True:
+                self._handle_message(irc, msg)
+                irc.inbox.task_done()
+                try:
+                    msg = irc.inbox.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
 
-            time = get_local_time(msg.time)
+            if self._draw_screen_soon is not None:
+                self._draw_screen_soon()
 
-            if isinstance(msg, libirc.ChannelJoinedEvent):
-                self._channel_member_update(msg, time, irc, [f" joined {msg.channel}"])
+    def _handle_message(self, irc: libirc.IRCClient, msg: libirc.Message):
+        if isinstance(msg, libirc.ConnectionClosedEvent):
+            raise urwid.ExitMainLoop()
 
-            elif isinstance(msg, libirc.ChannelPartEvent):
-                channel = self._channel_member_update(
-                    msg, time, irc, [f" left {msg.channel}"]
-                )
-                if msg.channel not in irc.channels:
-                    self.remove_buffer(channel)
-
-            elif isinstance(msg, libirc.ChannelKickEvent):
-                self._channel_member_update(
-                    msg,
-                    time,
-                    irc,
-                    [
-                        " kicked ",
-                        (nick_color(str(msg.kicked_nick)), str(msg.kicked_nick)),
-                        ": ",
-                        msg.reason,
-                    ],
-                    always_show=True,
-                )
+        time = get_local_time(msg.time)
 
-            elif isinstance(msg, libirc.NickChangedEvent):
-                self._channel_member_update(
-                    msg,
-                    time,
-                    irc,
-                    [
-                        " is now known as ",
-                        (nick_color(str(msg.new_nick)), str(msg.new_nick)),
-                    ],
-                )
+        if isinstance(msg, libirc.ChannelJoinedEvent):
+            self._channel_member_update(msg, time, irc, [f" joined {msg.channel}"])
 
-            elif isinstance(msg, libirc.QuitEvent):
-                self._channel_member_update(msg, time, irc, [f" quit: {msg.reason}"])
+        elif isinstance(msg, libirc.ChannelPartEvent):
+            channel = self._channel_member_update(
+                msg, time, irc, [f" left {msg.channel}"]
+            )
+            if msg.channel not in irc.channels:
+                self.remove_buffer(channel)
+
+        elif isinstance(msg, libirc.ChannelKickEvent):
+            self._channel_member_update(
+                msg,
+                time,
+                irc,
+                [
+                    " kicked ",
+                    (nick_color(str(msg.kicked_nick)), str(msg.kicked_nick)),
+                    ": ",
+                    msg.reason,
+                ],
+                always_show=True,
+            )
 
-            elif isinstance(msg, libirc.GoneAwayEvent):
-                self._channel_member_update(
-                    msg, time, irc, [f" has gone away: {msg.away_message}"]
-                )
+        elif isinstance(msg, libirc.NickChangedEvent):
+            self._channel_member_update(
+                msg,
+                time,
+                irc,
+                [
+                    " is now known as ",
+                    (nick_color(str(msg.new_nick)), str(msg.new_nick)),
+                ],
+            )
 
-            elif isinstance(msg, libirc.BackFromAwayEvent):
-                self._channel_member_update(msg, time, irc, [f" is back"])
-
-            elif isinstance(
-                msg, (libirc.NewMessageEvent, libirc.NewActionMessageEvent)
-            ):
-                if msg.channel == "*":
-                    buffer = self._get_buffer_by_name(irc, None)
-                else:
-                    buffer = self._get_buffer_by_name(irc, msg.channel)
-                if irc.nick in msg.message:
-                    buffer.has_notification = True
-                buffer.has_unread = True
-                if isinstance(msg, libirc.NewActionMessageEvent):
-                    line = urwid.Text(
-                        [
-                            ("Light gray", f"{time} "),
-                            (nick_color(str(msg.source)), str(msg.source)),
-                            ("Bold", f" {msg.message} "),
-                        ]
-                    )
-                else:
-                    line = urwid.Text(
-                        [
-                            ("Light gray", f"{time} "),
-                            (nick_color(str(msg.source)), str(msg.source)),
-                            ": ",
-                            *convert_formatting(msg.message),
-                        ]
-                    )
-                buffer.append(line)
-                self._update_content()
+        elif isinstance(msg, libirc.QuitEvent):
+            self._channel_member_update(msg, time, irc, [f" quit: {msg.reason}"])
 
-            elif isinstance(msg, libirc.ChannelTopicEvent):
-                buffer = self._get_buffer_by_name(irc, msg.channel)
-                buffer.append(urwid.Text(*convert_formatting(msg.topic)))
-                self._update_content()
+        elif isinstance(msg, libirc.GoneAwayEvent):
+            self._channel_member_update(
+                msg, time, irc, [f" has gone away: {msg.away_message}"]
+            )
 
-            elif isinstance(msg, libirc.ChannelTopicWhoTimeEvent):
+        elif isinstance(msg, libirc.BackFromAwayEvent):
+            self._channel_member_update(msg, time, irc, [f" is back"])
+
+        elif isinstance(msg, (libirc.NewMessageEvent, libirc.NewActionMessageEvent)):
+            if msg.channel == "*":
+                buffer = self._get_buffer_by_name(irc, None)
+            else:
                 buffer = self._get_buffer_by_name(irc, msg.channel)
-                buffer.append(
-                    urwid.Text(
-                        [
-                            "Set by ",
-                            (nick_color(str(msg.set_by)), str(msg.set_by)),
-                            f" on {get_local_date(msg.set_at)}",
-                        ]
-                    )
+            if irc.nick in msg.message:
+                buffer.has_notification = True
+            buffer.has_unread = True
+            if isinstance(msg, libirc.NewActionMessageEvent):
+                line = urwid.Text(
+                    [
+                        ("Light gray", f"{time} "),
+                        (nick_color(str(msg.source)), str(msg.source)),
+                        ("Bold", f" {msg.message} "),
+                    ]
                 )
-                self._update_content()
+            else:
+                line = urwid.Text(
+                    [
+                        ("Light gray", f"{time} "),
+                        (nick_color(str(msg.source)), str(msg.source)),
+                        ": ",
+                        *convert_formatting(msg.message),
+                    ]
+                )
+            buffer.append(line)
+            self._update_content()
 
-            elif isinstance(msg, libirc.ChannelNamesEvent):
-                buffer = self._get_buffer_by_name(irc, msg.channel)
-                buffer.members_updated = True
-                buffer.render()
-                self._update_content()
+        elif isinstance(msg, libirc.ChannelTopicEvent):
+            buffer = self._get_buffer_by_name(irc, msg.channel)
+            buffer.append(urwid.Text(*convert_formatting(msg.topic)))
+            self._update_content()
 
-            elif isinstance(msg, libirc.ChannelModeEvent):
-                buffer = self._get_buffer_by_name(irc, msg.channel)
-                buffer.members_updated = True
-                buffer.render()
+        elif isinstance(msg, libirc.ChannelTopicWhoTimeEvent):
+            buffer = self._get_buffer_by_name(irc, msg.channel)
+            buffer.append(
+                urwid.Text(
+                    [
+                        "Set by ",
+                        (nick_color(str(msg.set_by)), str(msg.set_by)),
+                        f" on {get_local_date(msg.set_at)}",
+                    ]
+                )
+            )
+            self._update_content()
 
-            elif isinstance(msg, libirc.ChannelTypingEvent):
-                buffer = self._get_buffer_by_name(irc, msg.channel)
-                buffer.render()
+        elif isinstance(msg, libirc.ChannelNamesEvent):
+            buffer = self._get_buffer_by_name(irc, msg.channel)
+            buffer.members_updated = True
+            buffer.render()
+            self._update_content()
 
-            elif isinstance(msg, libirc.NewMessageFromServerEvent):
-                buffer = self._get_buffer_by_name(irc, None)
-                buffer.append(
-                    urwid.Text(
-                        [("Light gray", f"{time} "), *convert_formatting(msg.message)]
-                    )
-                )
-                self._update_content()
+        elif isinstance(msg, libirc.ChannelModeEvent):
+            buffer = self._get_buffer_by_name(irc, msg.channel)
+            buffer.members_updated = True
+            buffer.render()
 
-            else:
-                buffer = self._get_buffer_by_name(irc, None)
-                buffer.append(urwid.Text(msg.command + " " + " ".join(msg.params)))
-                self._update_content()
+        elif isinstance(msg, libirc.ChannelTypingEvent):
+            buffer = self._get_buffer_by_name(irc, msg.channel)
+            buffer.render()
 
-            if self._draw_screen_soon is not None:
-                self._draw_screen_soon()
+        elif isinstance(msg, libirc.NewMessageFromServerEvent):
+            buffer = self._get_buffer_by_name(irc, None)
+            buffer.append(
+                urwid.Text(
+                    [("Light gray", f"{time} "), *convert_formatting(msg.message)]
+                )
+            )
+            self._update_content()
 
-            irc.inbox.task_done()
+        else:
+            buffer = self._get_buffer_by_name(irc, None)
+            buffer.append(urwid.Text(msg.command + " " + " ".join(msg.params)))
+            self._update_content()
 
 
 class CommandEdit(urwid_readline.ReadlineEdit):
@@ -1,3 +1,6 @@
+import queue
+from datetime import datetime, timezone
+
 from eternal.libirc import (
     IRCClient,
     Member,
@@ -15,6 +18,7 @@ from eternal.libirc import (
     parse_message_source,
     parse_message_tags,
     parse_received,
+    parse_rfc3339_datetime,
     parse_supported,
 )
 
@@ -27,6 +31,16 @@ def test_parse_received():
     assert messages[1].command == "BAR"
     assert recv_buffer == bytearray(b"BAZ")
 
+    recv_buffer.extend(b"\r\n")
+    messages = list(parse_received(recv_buffer))
+    assert len(messages) == 1
+    assert messages[0].command == "BAZ"
+    assert recv_buffer == bytearray()
+
+    recv_buffer = bytearray(b"PRIVMSG #chan :Hel")
+    assert list(parse_received(recv_buffer)) == []
+    assert recv_buffer == bytearray(b"PRIVMSG #chan :Hel")
+
 
 def test_parse_message():
     msg = parse_message(bytearray(b":dan!d@localhost PRIVMSG Foo bar"))
@@ -57,6 +71,8 @@ def test_parse_message_tags():
     assert parse_message_tags(r"a=\r\n") == {"a": "\r\n"}
     assert parse_message_tags(r"a=/!\\") == {"a": "/!\\"}
     assert parse_message_tags("a=a\\") == {"a": "a"}
+    assert parse_message_tags(r"a=\\s") == {"a": r"\s"}
+    assert parse_message_tags(r"a=\b") == {"a": "b"}
 
 
 def test_parse_message_params():
@@ -91,6 +107,13 @@ def test_parse_message_source():
     )
 
 
+def test_parse_rfc3339_datetime():
+    expected = datetime(2011, 10, 19, 16, 40, 51, 620000, tzinfo=timezone.utc)
+    assert parse_rfc3339_datetime("2011-10-19T16:40:51.620Z") == expected
+    assert parse_rfc3339_datetime("2011-10-19T16:40:51.620000Z") == expected
+    assert parse_rfc3339_datetime("2011-10-19T18:40:51.620+02:00") == expected
+
+
 def test_parse_capabilities_ls():
     params = [
         "*",
@@ -123,6 +146,22 @@ def test_parse_supported():
     assert not_supported == {"WHOX"}
 
 
+def test_ping_is_answered_without_parsing():
+    class FakeConnection:
+        def __init__(self):
+            self.sent = bytearray()
+
+        def send_bytes(self, data: bytes):
+            self.sent.extend(data)
+
+    connection = FakeConnection()
+    irc = IRCClient({"nick": "nick", "server": "server"}, queue.Queue())
+    irc._server_connection = connection
+    irc.add_received_data(b"PING :foo bar\r\nPING baz\r\nPI")
+    assert connection.sent == b"PONG :foo bar\r\nPONG baz\r\n"
+    assert irc._recv_buffer == b"PI"
+
+
 def test_get_sasl_plain_payload():
     assert get_sasl_plain_payload("foo", "bar") == "Zm9vAGZvbwBiYXI="
 
@@ -142,6 +181,11 @@ def test_sort_members():
     irc.member_prefixes = parse_member_prefixes("(Yqaohv)!~&@%+")
     assert irc.sort_members_by_prefix(members) == [m4, m1, m5, m6, m8, m7, m2, m3]
 
+    # Members sharing the same highest prefix are ordered by nick
+    m9 = Member(User(source=Source(nick="Bop")), prefixes="+@")
+    m10 = Member(User(source=Source(nick="aop")), prefixes="@")
+    assert irc.sort_members_by_prefix([m9, m1, m10]) == [m10, m9, m1]
+
 
 def test_parse_member_prefixes():
     assert parse_member_prefixes("") == {}
@@ -174,6 +218,19 @@ def test_parse_chanmodes():
     assert parse_chanmodes(",,,imn") == {"i": "D", "m": "D", "n": "D"}
 
 
+def test_iter_modestring():
+    irc = IRCClient({"nick": "nick", "server": "server"}, None)
+    irc.member_prefixes = parse_member_prefixes("(ov)@+")
+    irc.channel_modes = parse_chanmodes("b,k,l,imn")
+    assert list(irc._iter_modestring("+kox-lX", ["key", "foo"], True)) == [
+        (True, "k", "key"),
+        (True, "o", "foo"),
+        (True, "x", None),
+        (False, "l", None),
+        (False, "X", None),
+    ]
+
+
 def test_parse_ctcp_action():
     assert parse_ctcp_action("") is None
     assert parse_ctcp_action("foo") is None